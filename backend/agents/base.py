@@ -1,41 +1,225 @@
 # backend/agents/base.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import copy
 import json
 import os
 from datetime import datetime
+from .memory_stats import STATS_VERSION, empty_stats, update_stats, rebuild_stats
+from .memory_shards import DEFAULT_USER, MemoryShard, memory_shards, file_signature
+from .response_cache import response_cache
+from .output_budget import MAX_OUTPUT_TOKENS, OutputBudget, output_budgeter
+from .tracing import tracer
 
 # 🔑 CONFIGURATION - Mets ta clé API Gemini ici
 GEMINI_API_KEY = ""
 
 
+def extract_json(response: str) -> Optional[Dict[str, Any]]:
+    """Extract the outermost JSON object from an LLM response.
+
+    Returns None when the response contains no object at all and lets
+    json.JSONDecodeError propagate when the braces do not hold valid JSON.
+    """
+    with tracer.span("parse.extract_json", response_chars=len(response)):
+        start_idx = response.find('{')
+        end_idx = response.rfind('}') + 1
+        if start_idx == -1 or end_idx <= start_idx:
+            return None
+        return json.loads(response[start_idx:end_idx])
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    """Write JSON through a temporary file so a failed write never leaves a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
 class BaseAgent(ABC):
     def __init__(self, name: str):
         self.name = name
-        self.memory_file = "backend/memory/memory_store.json"
-
-    def load_memory(self) -> Dict[str, Any]:
-        """Load memory from JSON file"""
-        try:
-            with open(self.memory_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {"trips": [], "preferences": {}, "visited_places": []}
-
-    def save_memory(self, memory: Dict[str, Any]):
-        """Save memory to JSON file"""
-        import os
-        os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
-        with open(self.memory_file, 'w', encoding='utf-8') as f:
-            json.dump(memory, f, indent=2, ensure_ascii=False)
-
-    def add_to_memory(self, key: str, data: Any):
-        """Add data to memory"""
-        memory = self.load_memory()
-        if key not in memory:
-            memory[key] = []
-        memory[key].append(data)
-        self.save_memory(memory)
+        # Per-user memory shards, shared by all agents in the process
+        self.memory_shards = memory_shards
+        # Parsed responses for cacheable agents, shared by all agents in the process
+        self.response_cache = response_cache
+        # Output size estimates, shared so every request of a type learns together
+        self.output_budgeter = output_budgeter
+        # Set by subclasses to a genai.GenerativeModel
+        self.model = None
+        # Token usage of the most recent Gemini call, None if unavailable
+        self.last_usage: Optional[Dict[str, int]] = None
+
+    def call_gemini(self, prompt: str, budget: Optional[OutputBudget] = None) -> str:
+        """Call Google Gemini API, capping the output to the budget if given.
+
+        A reply cut off at the budget's cap is invalid JSON, so it is
+        retried once with the model's full output limit.
+        """
+        self.last_usage = None
+        with tracer.span("llm.generate_content", agent=self.name, prompt_chars=len(prompt)) as span:
+            try:
+                generation_config = budget.generation_config() if budget is not None else None
+                response, usage = self._generate(prompt, budget, generation_config)
+                if (usage is not None and usage["truncated"]
+                        and generation_config is not None
+                        and generation_config["max_output_tokens"] < MAX_OUTPUT_TOKENS):
+                    first_usage = usage
+                    generation_config = {"max_output_tokens": MAX_OUTPUT_TOKENS}
+                    response, usage = self._generate(prompt, budget, generation_config)
+                    if usage is not None:
+                        # Report what the request cost, both calls included
+                        for key in ("prompt_tokens", "output_tokens", "total_tokens"):
+                            usage[key] = (usage[key] or 0) + (first_usage[key] or 0)
+                        usage["retried"] = True
+                if span is not None:
+                    if generation_config is not None:
+                        span.set_attribute("max_output_tokens", generation_config["max_output_tokens"])
+                    for key, value in (usage or {}).items():
+                        span.set_attribute(key, value)
+                text = response.text
+                self.last_usage = usage
+                return text
+            except Exception as e:
+                if span is not None:
+                    span.set_error(e)
+                return f"Error calling Gemini API: {str(e)}"
+
+    def _generate(self, prompt: str, budget: Optional[OutputBudget],
+                  generation_config: Optional[Dict[str, int]]):
+        """One generate_content call; returns the response and its usage (None if unavailable)"""
+        if generation_config is not None:
+            response = self.model.generate_content(prompt, generation_config=generation_config)
+        else:
+            response = self.model.generate_content(prompt)
+        # Agents are shared across threads (API threadpool, prewarm workers),
+        # so usage is built locally and only published on the instance by call_gemini
+        usage = None
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is not None:
+            candidates = getattr(response, "candidates", None) or []
+            finish_reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+            truncated = getattr(finish_reason, "name", str(finish_reason)) == "MAX_TOKENS"
+            usage = {
+                "prompt_tokens": metadata.prompt_token_count,
+                "output_tokens": metadata.candidates_token_count,
+                "total_tokens": metadata.total_token_count,
+                "truncated": truncated
+            }
+            if budget is not None:
+                self.output_budgeter.observe(budget, usage["output_tokens"], truncated)
+        return response, usage
+
+    # Public memory methods lock the user's shard once and hand that same shard
+    # to the _helpers below, so nested steps never look up (and lock) another one.
+
+    def load_memory(self, user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        """Load a user's memory, re-parsing the JSON file only when it changed.
+
+        The returned dict is the shard's cached state: persist changes with
+        save_memory instead of mutating it in place.
+        """
+        shard = self.memory_shards.get(user_id)
+        with shard.lock:
+            return self._load_memory(shard)
+
+    def save_memory(self, memory: Dict[str, Any], user_id: str = DEFAULT_USER):
+        """Save a user's memory to its JSON file"""
+        shard = self.memory_shards.get(user_id)
+        with shard.lock:
+            self._save_memory(shard, memory)
+
+    def add_to_memory(self, key: str, data: Any, user_id: str = DEFAULT_USER):
+        """Add data to a user's memory"""
+        shard = self.memory_shards.get(user_id)
+        with shard.lock, tracer.span("memory.add", user_id=user_id, key=key):
+            # Read aggregates first so a missing stats file is rebuilt without this trip
+            stats = self._load_stats(shard) if key == "trips" else None
+
+            # Append to a copy so the cached state only changes once the write succeeded
+            memory = dict(self._load_memory(shard))
+            memory[key] = memory.get(key, []) + [data]
+            self._save_memory(shard, memory)
+
+            # Keep the history aggregates current so /memory/stats never rescans trips
+            if stats is not None:
+                self._save_stats(shard, update_stats(copy.deepcopy(stats), data))
+
+    def load_stats(self, user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        """Load a user's running history aggregates, rebuilding them if missing or stale"""
+        shard = self.memory_shards.get(user_id)
+        with shard.lock:
+            return self._load_stats(shard)
+
+    def save_stats(self, stats: Dict[str, Any], user_id: str = DEFAULT_USER):
+        """Save a user's running history aggregates to JSON file"""
+        shard = self.memory_shards.get(user_id)
+        with shard.lock:
+            self._save_stats(shard, stats)
+
+    def rebuild_stats(self, user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        """Recompute a user's aggregates from their full trip history (on demand only)"""
+        shard = self.memory_shards.get(user_id)
+        with shard.lock:
+            return self._rebuild_stats(shard)
+
+    def clear_memory(self, user_id: str = DEFAULT_USER):
+        """Reset a user's memory and its aggregates"""
+        shard = self.memory_shards.get(user_id)
+        with shard.lock:
+            self._save_memory(shard, {"trips": [], "preferences": {}, "visited_places": []})
+            self._save_stats(shard, empty_stats())
+
+    def _load_memory(self, shard: MemoryShard) -> Dict[str, Any]:
+        signature = file_signature(shard.memory_file)
+        cached = shard.memory is not None and signature == shard.memory_signature
+        with tracer.span("memory.load", user_id=shard.user_id, cached=cached):
+            if not cached:
+                try:
+                    with open(shard.memory_file, 'r', encoding='utf-8') as f:
+                        shard.memory = json.load(f)
+                except FileNotFoundError:
+                    shard.memory = {"trips": [], "preferences": {}, "visited_places": []}
+                shard.memory_signature = signature
+        return shard.memory
+
+    def _save_memory(self, shard: MemoryShard, memory: Dict[str, Any]):
+        with tracer.span("memory.save", user_id=shard.user_id, trips=len(memory.get("trips", []))):
+            _write_json(shard.memory_file, memory)
+            shard.memory = memory
+            shard.memory_signature = file_signature(shard.memory_file)
+
+    def _load_stats(self, shard: MemoryShard) -> Dict[str, Any]:
+        signature = file_signature(shard.stats_file)
+        cached = shard.stats is not None and signature == shard.stats_signature
+        with tracer.span("memory.load_stats", user_id=shard.user_id, cached=cached):
+            if not cached:
+                if signature is None:
+                    return self._rebuild_stats(shard)
+                with open(shard.stats_file, 'r', encoding='utf-8') as f:
+                    stats = json.load(f)
+                if stats.get("version") != STATS_VERSION:
+                    return self._rebuild_stats(shard)
+                shard.stats = stats
+                shard.stats_signature = signature
+            # Trips and stats are separate files: if saving the stats failed after
+            # a trip was saved, the counts differ and the aggregates are recomputed
+            if shard.stats.get("trip_count") != len(self._load_memory(shard).get("trips", [])):
+                return self._rebuild_stats(shard)
+        return shard.stats
+
+    def _save_stats(self, shard: MemoryShard, stats: Dict[str, Any]):
+        with tracer.span("memory.save_stats", user_id=shard.user_id):
+            _write_json(shard.stats_file, stats)
+            shard.stats = stats
+            shard.stats_signature = file_signature(shard.stats_file)
+
+    def _rebuild_stats(self, shard: MemoryShard) -> Dict[str, Any]:
+        stats = rebuild_stats(self._load_memory(shard).get("trips", []))
+        self._save_stats(shard, stats)
+        return stats
 
     @abstractmethod
     def process_request(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
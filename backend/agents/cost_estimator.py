@@ -1,85 +1,181 @@
 # backend/agents/cost_estimator.py
 import google.generativeai as genai
 import json
-from typing import Dict, Any
-from .base import BaseAgent, GEMINI_API_KEY
+from typing import Dict, Any, List, Optional
+from .base import BaseAgent, GEMINI_API_KEY, extract_json
+from .tracing import tracer
+from .output_budget import OutputBudget
+from .response_cache import make_cache_key
+
+BUDGET_LEVELS = ["budget", "mid_range", "luxury"]
+# Typical prices per budget level that every estimate for a destination is built from
+UNIT_FIELDS = [
+    "accommodation_per_night", "food_per_day", "local_transport_per_day",
+    "activities_per_day", "shopping_per_day", "flights"
+]
+EMERGENCY_RATE = 0.10
+
+
+def parse_unit_costs(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Validate unit cost data from the LLM, None if a level or price is missing"""
+    if not isinstance(data, dict):
+        return None
+    levels = {}
+    for level in BUDGET_LEVELS:
+        prices = (data.get("budget_levels") or {}).get(level)
+        if not isinstance(prices, dict):
+            return None
+        try:
+            levels[level] = {field: round(float(prices[field])) for field in UNIT_FIELDS}
+        except (KeyError, TypeError, ValueError):
+            return None
+    return {"budget_levels": levels, "money_saving_tips": list(data.get("money_saving_tips") or [])}
+
+
+def build_cost_breakdown(units: Dict[str, Any], budget: float, duration: int) -> Dict[str, Any]:
+    """Scale per-destination unit costs to a trip's duration and check them against its budget"""
+    duration = max(1, duration or 1)
+    budget_levels = {}
+    for level in BUDGET_LEVELS:
+        prices = units["budget_levels"][level]
+        local = prices["local_transport_per_day"] * duration
+        subtotal = (
+            prices["accommodation_per_night"] * duration
+            + prices["flights"] + local
+            + (prices["food_per_day"] + prices["activities_per_day"] + prices["shopping_per_day"]) * duration
+        )
+        emergency = round(subtotal * EMERGENCY_RATE)
+        budget_levels[level] = {
+            "accommodation": {
+                "per_night": prices["accommodation_per_night"],
+                "total": prices["accommodation_per_night"] * duration
+            },
+            "transportation": {"flights": prices["flights"], "local": local, "total": prices["flights"] + local},
+            "food": {"per_day": prices["food_per_day"], "total": prices["food_per_day"] * duration},
+            "activities": prices["activities_per_day"] * duration,
+            "shopping": prices["shopping_per_day"] * duration,
+            "emergency": emergency,
+            "total": subtotal + emergency
+        }
+
+    # Plan the days at the most comfortable level the budget covers
+    affordable = [level for level in BUDGET_LEVELS if budget_levels[level]["total"] <= budget]
+    level = affordable[-1] if affordable else BUDGET_LEVELS[0]
+    prices = units["budget_levels"][level]
+    daily = {
+        "meals": prices["food_per_day"],
+        "activities": prices["activities_per_day"],
+        "transport": prices["local_transport_per_day"]
+    }
+
+    budget_alerts = []
+    if not affordable:
+        budget_alerts.append(
+            f"Even the budget level (${budget_levels[BUDGET_LEVELS[0]]['total']}) exceeds your ${budget:g} budget"
+        )
+    elif level != BUDGET_LEVELS[-1]:
+        budget_alerts.append(f"Your ${budget:g} budget covers the {level.replace('_', '-')} level")
+
+    return {
+        "budget_levels": budget_levels,
+        "daily_spending_guide": [
+            {"day": day, "estimated_spending": sum(daily.values()), "breakdown": dict(daily)}
+            for day in range(1, duration + 1)
+        ],
+        "money_saving_tips": units.get("money_saving_tips", []),
+        "budget_alerts": budget_alerts
+    }
 
 
 class CostEstimatorAgent(BaseAgent):
+    """Estimates trip costs from per-destination unit costs.
+
+    Prices per night/day at each budget level only depend on the
+    destination, so they are generated (and cached, and pre-warmed) once
+    per destination; the breakdown for a given budget and duration is
+    computed from them without another LLM call.
+    """
+
     def __init__(self):
         super().__init__("Cost Estimator")
         # Configuration automatique avec la clé API
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
 
-    def call_gemini(self, prompt: str) -> str:
-        """Call Google Gemini API"""
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"Error calling Gemini API: {str(e)}"
-
     def process_request(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
         destination = user_input.get("destination", "")
-        budget = user_input.get("budget", 0)
+        budget = user_input.get("budget", 0) or 0
         duration = user_input.get("duration", 3)
-        activities = user_input.get("activities", [])
 
-        prompt = f"""
-        Provide a detailed cost breakdown for a {duration}-day trip to {destination}.
-        Budget: ${budget}
-        Planned activities: {json.dumps(activities, indent=2)}
+        units = self.unit_costs(destination)
+        if "error" in units:
+            cost_data = {"error": units["error"]}
+        else:
+            cost_data = build_cost_breakdown(units["unit_costs"], budget, duration)
+
+        return {
+            "agent": self.name,
+            "cost_breakdown": cost_data,
+            "raw_response": units["raw_response"]
+        }
+
+    def unit_costs(self, destination: str) -> Dict[str, Any]:
+        """Unit costs for a destination, from the response cache when available"""
+        # A cache hit makes no Gemini call, so don't report the previous call's usage
+        self.last_usage = None
+        cache_key = make_cache_key("cost_units", destination=destination)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        Please estimate costs for:
-        1. Accommodation (per night and total)
-        2. Transportation (flights, local transport)
-        3. Food (breakfast, lunch, dinner per day)
-        4. Activities and attractions
-        5. Shopping and souvenirs
-        6. Emergency fund (10% of total)
+        # Nothing but the destination may shape the prompt, it is the whole cache key
+        output_budget = self.output_budgeter.plan("cost_units", 1, 0)
+        with tracer.span("prompt.build", agent=self.name):
+            prompt = self._build_prompt(destination, output_budget)
 
-        Provide 3 budget levels: Budget, Mid-range, Luxury
+        response = self.call_gemini(prompt, output_budget)
 
-        Format as JSON:
+        # Try to parse JSON from response
+        try:
+            units = parse_unit_costs(extract_json(response))
+            error = None if units is not None else "Could not parse cost data"
+        except json.JSONDecodeError:
+            units, error = None, "Invalid JSON response"
+
+        if error:
+            return {"error": error, "raw_response": response}
+        result = {"unit_costs": units, "raw_response": response}
+        self.response_cache.set(cache_key, result)
+        return result
+
+    def _build_prompt(self, destination: str, output_budget: OutputBudget) -> str:
+        return f"""
+        Provide typical travel prices in USD for {destination} at 3 budget levels: Budget, Mid-range, Luxury.
+
+        For each level estimate:
+        1. Accommodation per night
+        2. Food per day (breakfast, lunch, dinner)
+        3. Local transport per day
+        4. Activities and attractions per day
+        5. Shopping and souvenirs per day
+        6. A typical round-trip flight
+
+        Add at most {output_budget.list_items} money saving tips for {destination}.
+
+        Format as JSON with plain numbers:
         {{
             "budget_levels": {{
                 "budget": {{
-                    "accommodation": {{"per_night": 50, "total": 150}},
-                    "transportation": {{"flights": 300, "local": 60}},
-                    "food": {{"per_day": 30, "total": 90}},
-                    "activities": 100,
-                    "shopping": 50,
-                    "emergency": 75,
-                    "total": 825
+                    "accommodation_per_night": 50,
+                    "food_per_day": 30,
+                    "local_transport_per_day": 10,
+                    "activities_per_day": 25,
+                    "shopping_per_day": 10,
+                    "flights": 300
                 }},
                 "mid_range": {{}},
                 "luxury": {{}}
             }},
-            "daily_spending_guide": [
-                {{"day": 1, "estimated_spending": 120, "breakdown": {{"meals": 40, "activities": 60, "transport": 20}}}},
-            ],
-            "money_saving_tips": ["Tip 1", "Tip 2"],
-            "budget_alerts": ["Warning if over budget"]
+            "money_saving_tips": ["Tip 1", "Tip 2"]
         }}
         """
-
-        response = self.call_gemini(prompt)
-
-        # Try to parse JSON from response
-        try:
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                cost_data = json.loads(json_str)
-            else:
-                cost_data = {"error": "Could not parse cost estimate"}
-        except json.JSONDecodeError:
-            cost_data = {"error": "Invalid JSON response"}
-
-        return {
-            "agent": self.name,
-            "cost_breakdown": cost_data,
-            "raw_response": response
-        }
\ No newline at end of file
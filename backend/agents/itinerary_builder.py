@@ -2,7 +2,10 @@
 import google.generativeai as genai
 import json
 from typing import Dict, Any, List
-from .base import BaseAgent, GEMINI_API_KEY
+from .base import BaseAgent, GEMINI_API_KEY, extract_json
+from .tracing import tracer
+from .output_budget import OutputBudget
+from .memory_shards import DEFAULT_USER
 from datetime import datetime
 
 
@@ -13,31 +16,65 @@ class ItineraryBuilderAgent(BaseAgent):
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
 
-    def call_gemini(self, prompt: str) -> str:
-        """Call Google Gemini API"""
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"Error calling Gemini API: {str(e)}"
-
     def process_request(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        self.last_usage = None
         destination = user_input.get("destination", "")
         budget = user_input.get("budget", 0)
         interests = user_input.get("interests", [])
         duration = user_input.get("duration", 3)
+        user_id = user_input.get("user_id") or DEFAULT_USER
 
         # Load previous preferences from memory
-        memory = self.load_memory()
+        memory = self.load_memory(user_id)
         previous_trips = memory.get("trips", [])
         preferences = memory.get("preferences", {})
 
-        prompt = f"""
+        # Size the output to the trip so long itineraries are not cut off mid-JSON
+        output_budget = self.output_budgeter.plan("itinerary", duration, len(interests))
+        with tracer.span("prompt.build", agent=self.name):
+            prompt = self._build_prompt(destination, budget, interests, duration, preferences, output_budget)
+
+        response = self.call_gemini(prompt, output_budget)
+
+        # Try to parse JSON from response
+        try:
+            # Extract JSON from response if it contains other text
+            itinerary_data = extract_json(response)
+            if itinerary_data is None:
+                # Fallback if JSON parsing fails
+                itinerary_data = {"days": [], "error": "Could not parse itinerary"}
+        except json.JSONDecodeError:
+            itinerary_data = {"days": [], "error": "Invalid JSON response"}
+
+        # Save to memory
+        trip_data = {
+            "destination": destination,
+            "budget": budget,
+            "interests": interests,
+            "duration": duration,
+            "itinerary": itinerary_data,
+            "created_at": str(datetime.now())
+        }
+        # A failed generation is not a planned trip, keep it out of history and stats
+        if "error" not in itinerary_data:
+            self.add_to_memory("trips", trip_data, user_id)
+
+        return {
+            "agent": self.name,
+            "itinerary": itinerary_data,
+            "raw_response": response
+        }
+
+    def _build_prompt(self, destination: str, budget: float, interests: List[str], duration: int,
+                      preferences: Dict[str, Any], output_budget: OutputBudget) -> str:
+        preferences_section = f"Previous travel preferences: {json.dumps(preferences)}" if preferences else ""
+
+        return f"""
         Create a detailed {duration}-day itinerary for {destination}.
         Budget: ${budget}
         Interests: {', '.join(interests)}
 
-        Previous travel preferences: {json.dumps(preferences, indent=2)}
+        {preferences_section}
 
         Please provide:
         1. Daily schedule with activities
@@ -46,6 +83,8 @@ class ItineraryBuilderAgent(BaseAgent):
         4. Must-see attractions based on interests
         5. Free/budget-friendly alternatives
 
+        Keep it concise: at most {output_budget.activities_per_day} activities per day and {output_budget.description_hint}.
+
         Format as JSON with this structure:
         {{
             "days": [
@@ -65,36 +104,3 @@ class ItineraryBuilderAgent(BaseAgent):
             ]
         }}
         """
-
-        response = self.call_gemini(prompt)
-
-        # Try to parse JSON from response
-        try:
-            # Extract JSON from response if it contains other text
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                itinerary_data = json.loads(json_str)
-            else:
-                # Fallback if JSON parsing fails
-                itinerary_data = {"days": [], "error": "Could not parse itinerary"}
-        except json.JSONDecodeError:
-            itinerary_data = {"days": [], "error": "Invalid JSON response"}
-
-        # Save to memory
-        trip_data = {
-            "destination": destination,
-            "budget": budget,
-            "interests": interests,
-            "duration": duration,
-            "itinerary": itinerary_data,
-            "created_at": str(datetime.now())
-        }
-        self.add_to_memory("trips", trip_data)
-
-        return {
-            "agent": self.name,
-            "itinerary": itinerary_data,
-            "raw_response": response
-        }
\ No newline at end of file
@@ -1,8 +1,11 @@
 # backend/agents/local_culture_coach.py
 import google.generativeai as genai
 import json
-from typing import Dict, Any
-from .base import BaseAgent, GEMINI_API_KEY
+from typing import Dict, Any, List
+from .base import BaseAgent, GEMINI_API_KEY, extract_json
+from .tracing import tracer
+from .output_budget import OutputBudget
+from .response_cache import make_cache_key
 
 
 class LocalCultureCoachAgent(BaseAgent):
@@ -12,19 +15,43 @@ class LocalCultureCoachAgent(BaseAgent):
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
 
-    def call_gemini(self, prompt: str) -> str:
-        """Call Google Gemini API"""
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"Error calling Gemini API: {str(e)}"
-
     def process_request(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        # A cache hit makes no Gemini call, so don't report the previous call's usage
+        self.last_usage = None
         destination = user_input.get("destination", "")
         interests = user_input.get("interests", [])
 
-        prompt = f"""
+        # Cultural guidance only depends on the destination and interests
+        cache_key = make_cache_key("culture", destination=destination, interests=interests)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        output_budget = self.output_budgeter.plan("culture", user_input.get("duration", 3), len(interests))
+        with tracer.span("prompt.build", agent=self.name):
+            prompt = self._build_prompt(destination, interests, output_budget)
+
+        response = self.call_gemini(prompt, output_budget)
+
+        # Try to parse JSON from response
+        try:
+            culture_data = extract_json(response)
+            if culture_data is None:
+                culture_data = {"error": "Could not parse cultural advice"}
+        except json.JSONDecodeError:
+            culture_data = {"error": "Invalid JSON response"}
+
+        result = {
+            "agent": self.name,
+            "cultural_guide": culture_data,
+            "raw_response": response
+        }
+        if "error" not in culture_data:
+            self.response_cache.set(cache_key, result)
+        return result
+
+    def _build_prompt(self, destination: str, interests: List[str], output_budget: OutputBudget) -> str:
+        return f"""
         Provide comprehensive cultural guidance for traveling to {destination}.
         Traveler interests: {', '.join(interests)}
 
@@ -40,6 +67,8 @@ class LocalCultureCoachAgent(BaseAgent):
         9. Hidden gems known to locals
         10. Safety and cultural sensitivity tips
 
+        Keep every list to at most {output_budget.list_items} items.
+
         Format as JSON:
         {{
             "cultural_etiquette": [
@@ -70,23 +99,3 @@ class LocalCultureCoachAgent(BaseAgent):
             "cultural_warnings": ["Avoid pointing with index finger", "Remove shoes indoors"]
         }}
         """
-
-        response = self.call_gemini(prompt)
-
-        # Try to parse JSON from response
-        try:
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                culture_data = json.loads(json_str)
-            else:
-                culture_data = {"error": "Could not parse cultural advice"}
-        except json.JSONDecodeError:
-            culture_data = {"error": "Invalid JSON response"}
-
-        return {
-            "agent": self.name,
-            "cultural_guide": culture_data,
-            "raw_response": response
-        }
\ No newline at end of file
@@ -0,0 +1,105 @@
+# backend/agents/memory_shards.py
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import os
+import re
+import threading
+import weakref
+
+DEFAULT_USER = "default"
+MEMORY_DIR = "backend/memory"
+MAX_OPEN_SHARDS = int(os.getenv("MEMORY_MAX_OPEN_SHARDS", "128"))
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class MemoryShard:
+    """One user's memory files plus their parsed state.
+
+    The lock serializes this user's reads and writes within the process.
+    memory/stats hold the last loaded or saved state and are None until
+    first use; the *_signature fields record the file they came from so a
+    change made by another process is picked up on the next load.
+    """
+
+    def __init__(self, user_id: str, directory: str):
+        self.user_id = user_id
+        self.memory_file = os.path.join(directory, "memory_store.json")
+        self.stats_file = os.path.join(directory, "memory_stats.json")
+        self.lock = threading.RLock()
+        self.memory: Optional[Dict[str, Any]] = None
+        self.stats: Optional[Dict[str, Any]] = None
+        self.memory_signature: Optional[Tuple[int, int]] = None
+        self.stats_signature: Optional[Tuple[int, int]] = None
+
+
+class ShardCache:
+    """Bounded LRU of memory shards keyed by user id.
+
+    Evicting a shard only drops the LRU's reference. While a caller still
+    holds it (typically under its lock) get() keeps returning that same
+    shard, so a user never has two shards with two different locks.
+    """
+
+    def __init__(self, base_dir: str = MEMORY_DIR, max_open: int = MAX_OPEN_SHARDS):
+        self.base_dir = base_dir
+        self.max_open = max(1, max_open)
+        self._shards: "OrderedDict[str, MemoryShard]" = OrderedDict()
+        self._live: "weakref.WeakValueDictionary[str, MemoryShard]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def shard_dir(self, user_id: str) -> str:
+        """Directory holding a user's files.
+
+        The default user keeps the legacy location so existing stores keep
+        working; other ids are sanitized into a directory name under users/.
+        """
+        if user_id == DEFAULT_USER:
+            return self.base_dir
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", user_id)[:64]
+        if safe_id != user_id:
+            # Sanitizing can merge distinct ids, so disambiguate with a hash
+            safe_id = f"{safe_id}-{hashlib.sha1(user_id.encode('utf-8')).hexdigest()[:10]}"
+        return os.path.join(self.base_dir, "users", safe_id)
+
+    def get(self, user_id: Optional[str] = None) -> MemoryShard:
+        """Return the shard for user_id, opening it and evicting the LRU shard if needed"""
+        user_id = user_id or DEFAULT_USER
+        with self._lock:
+            shard = self._shards.get(user_id)
+            if shard is not None:
+                self._shards.move_to_end(user_id)
+                return shard
+
+            shard = self._live.get(user_id)
+            if shard is None:
+                shard = MemoryShard(user_id, self.shard_dir(user_id))
+                self._live[user_id] = shard
+            self._shards[user_id] = shard
+            self._evict()
+            return shard
+
+    def _evict(self):
+        """Drop least recently used shards; ones still in use stay live until released"""
+        while len(self._shards) > self.max_open:
+            self._shards.popitem(last=False)
+
+    def clear(self):
+        """Forget all parsed state; files on disk are untouched"""
+        with self._lock:
+            self._shards.clear()
+
+    def __len__(self) -> int:
+        return len(self._shards)
+
+
+# Shared by every agent so a user's parsed memory is loaded once per process
+memory_shards = ShardCache()
@@ -0,0 +1,94 @@
+# backend/agents/memory_stats.py
+from typing import Dict, Any, List
+from datetime import datetime
+
+# Bump when the aggregate layout changes so stored stats are rebuilt on load
+STATS_VERSION = 2
+
+
+def destination_key(destination: str) -> str:
+    """Case- and whitespace-insensitive identity of a destination"""
+    return " ".join(str(destination).lower().split())
+
+
+def empty_stats() -> Dict[str, Any]:
+    """Running aggregates for an empty travel history"""
+    return {
+        "version": STATS_VERSION,
+        "trip_count": 0,
+        "budget_total": 0,
+        "duration_total": 0,
+        "destinations": {},
+        "interests": {},
+        "months": {},
+        "updated_at": str(datetime.now())
+    }
+
+
+def update_stats(stats: Dict[str, Any], trip: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold a single trip into the running aggregates (O(1) per trip)"""
+    budget = trip.get("budget", 0) or 0
+    duration = trip.get("duration", 0) or 0
+
+    stats["trip_count"] += 1
+    stats["budget_total"] += budget
+    stats["duration_total"] += duration
+
+    # "Paris, France" and "paris,  france" are one destination, shown as first seen
+    destination = (trip.get("destination") or "").strip() or "Unknown"
+    entry = stats["destinations"].setdefault(
+        destination_key(destination), {"name": destination, "count": 0, "budget_total": 0, "duration_total": 0}
+    )
+    entry["count"] += 1
+    entry["budget_total"] += budget
+    entry["duration_total"] += duration
+
+    for interest in trip.get("interests", []):
+        stats["interests"][interest] = stats["interests"].get(interest, 0) + 1
+
+    # created_at is str(datetime), so the first 7 characters are YYYY-MM
+    month = str(trip.get("created_at", ""))[:7] or "unknown"
+    stats["months"][month] = stats["months"].get(month, 0) + 1
+
+    stats["updated_at"] = str(datetime.now())
+    return stats
+
+
+def rebuild_stats(trips: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Recompute the aggregates from scratch by scanning every trip"""
+    stats = empty_stats()
+    for trip in trips:
+        update_stats(stats, trip)
+    return stats
+
+
+def summarize_stats(stats: Dict[str, Any], top_n: int = 10) -> Dict[str, Any]:
+    """Turn raw aggregates into dashboard-ready figures.
+
+    Cost depends on the number of distinct destinations, interests and
+    months, never on the number of trips stored.
+    """
+    trip_count = stats.get("trip_count", 0)
+    destinations = stats.get("destinations", {})
+
+    top_destinations = sorted(destinations.items(), key=lambda item: item[1]["count"], reverse=True)[:top_n]
+
+    return {
+        "trip_count": trip_count,
+        "average_budget": round(stats.get("budget_total", 0) / trip_count, 2) if trip_count else 0,
+        "average_duration": round(stats.get("duration_total", 0) / trip_count, 2) if trip_count else 0,
+        "top_destinations": [
+            {
+                "destination": data.get("name", name),
+                "trips": data["count"],
+                "average_budget": round(data["budget_total"] / data["count"], 2),
+                "average_duration": round(data["duration_total"] / data["count"], 2)
+            }
+            for name, data in top_destinations
+        ],
+        "interest_frequency": dict(
+            sorted(stats.get("interests", {}).items(), key=lambda item: item[1], reverse=True)
+        ),
+        "trips_per_month": dict(sorted(stats.get("months", {}).items())),
+        "updated_at": stats.get("updated_at")
+    }
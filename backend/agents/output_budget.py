@@ -0,0 +1,180 @@
+# backend/agents/output_budget.py
+from typing import Dict, Optional
+import json
+import os
+import threading
+
+from .memory_shards import MEMORY_DIR
+
+# gemini-2.0-flash cannot generate more than 8192 output tokens
+MAX_OUTPUT_TOKENS = int(os.getenv("OUTPUT_BUDGET_MAX_TOKENS", "8192"))
+# The hard cap stays well above the estimate until the constants below are
+# calibrated on real outputs: the estimate sizes the prompt, the cap only
+# stops runaway generations
+MIN_OUTPUT_TOKENS = int(os.getenv("OUTPUT_BUDGET_MIN_TOKENS", "2048"))
+CAP_FACTOR = float(os.getenv("OUTPUT_BUDGET_CAP_FACTOR", "2.0"))
+# Extra room on top of the estimate so normal variance never truncates the JSON
+HEADROOM = float(os.getenv("OUTPUT_BUDGET_HEADROOM", "1.3"))
+# Learned corrections survive restarts here
+BUDGET_STATE = os.getenv("OUTPUT_BUDGET_STATE", os.path.join(MEMORY_DIR, "output_budget.json"))
+
+# Starting token estimates per agent type: fixed part, per trip day, per interest.
+# Itinerary activities are counted separately since their number and detail vary.
+# "cost" is the combined planner's cost section, "cost_units" the cost agent's
+# per-destination prices.
+BASE_TOKENS = {"itinerary": 150, "cost": 600, "culture": 900, "cost_units": 400}
+PER_DAY_TOKENS = {"itinerary": 20, "cost": 40, "culture": 0, "cost_units": 0}
+PER_INTEREST_TOKENS = {"itinerary": 20, "cost": 0, "culture": 40, "cost_units": 0}
+COMBINED_TYPES = ["itinerary", "cost", "culture"]
+PER_ACTIVITY_TOKENS = {False: 65, True: 35}  # keyed by short_descriptions
+MIN_ACTIVITIES_PER_DAY = 2
+
+
+class OutputBudget:
+    """Generation limits and prompt sizing for one LLM call"""
+
+    def __init__(self, agent_type: str, duration: int, interest_count: int,
+                 max_output_tokens: int, activities_per_day: int, list_items: int,
+                 short_descriptions: bool = False):
+        self.agent_type = agent_type
+        self.duration = duration
+        self.interest_count = interest_count
+        self.max_output_tokens = max_output_tokens
+        self.activities_per_day = activities_per_day
+        self.list_items = list_items
+        self.short_descriptions = short_descriptions
+
+    @property
+    def description_hint(self) -> str:
+        return "descriptions of at most 8 words" if self.short_descriptions else "one-sentence descriptions"
+
+    def generation_config(self) -> Dict[str, int]:
+        return {"max_output_tokens": self.max_output_tokens}
+
+
+class OutputBudgeter:
+    """Estimates output size per request and learns from observed outputs.
+
+    The static per-day/per-interest model is scaled by a per agent type
+    correction factor, an exponential moving average of observed/estimated
+    output tokens. Truncated outputs only give a lower bound, so they push
+    the factor up more aggressively. Factors are saved to state_file after
+    each observation and loaded back on start; None keeps them in memory.
+    """
+
+    def __init__(self, headroom: float = HEADROOM, smoothing: float = 0.2,
+                 state_file: Optional[str] = BUDGET_STATE):
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.state_file = state_file
+        self.correction: Dict[str, float] = {}
+        self.observations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if state_file and os.path.exists(state_file):
+            try:
+                self._load()
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Could not load output budget state {state_file}: {e}")
+
+    def _types(self, agent_type: str):
+        # The combined planner produces all three sections in one output
+        return COMBINED_TYPES if agent_type == "combined" else [agent_type]
+
+    def raw_estimate(self, agent_type: str, duration: int, interest_count: int,
+                     activities_per_day: int = 0, short_descriptions: bool = False) -> int:
+        total = 0
+        for t in self._types(agent_type):
+            total += BASE_TOKENS[t] + PER_DAY_TOKENS[t] * duration + PER_INTEREST_TOKENS[t] * interest_count
+            if t == "itinerary":
+                total += PER_ACTIVITY_TOKENS[short_descriptions] * activities_per_day * duration
+        return total
+
+    def _budget_estimate(self, agent_type: str, duration: int, interest_count: int,
+                         activities_per_day: int, short_descriptions: bool) -> float:
+        raw = self.raw_estimate(agent_type, duration, interest_count, activities_per_day, short_descriptions)
+        return raw * self.correction.get(agent_type, 1.0) * self.headroom
+
+    def plan(self, agent_type: str, duration: int, interest_count: int) -> OutputBudget:
+        duration = max(1, duration or 1)
+        interest_count = max(0, interest_count or 0)
+        list_items = min(6, 3 + interest_count // 2)
+
+        # Start from the preferred level of detail, then trade detail for fit:
+        # shorter descriptions first, then fewer activities per day, until the
+        # estimate with headroom fits under the model's output limit
+        activities_per_day = 5 if duration <= 3 else 4 if duration <= 7 else 3
+        short_descriptions = False
+        estimate = self._budget_estimate(agent_type, duration, interest_count,
+                                         activities_per_day, short_descriptions)
+        while estimate > MAX_OUTPUT_TOKENS:
+            if not short_descriptions:
+                short_descriptions = True
+            elif activities_per_day > MIN_ACTIVITIES_PER_DAY:
+                activities_per_day -= 1
+            else:
+                break
+            estimate = self._budget_estimate(agent_type, duration, interest_count,
+                                             activities_per_day, short_descriptions)
+
+        max_output_tokens = int(min(MAX_OUTPUT_TOKENS, max(MIN_OUTPUT_TOKENS, estimate * CAP_FACTOR)))
+        return OutputBudget(agent_type, duration, interest_count, max_output_tokens,
+                            activities_per_day, list_items, short_descriptions)
+
+    def observe(self, budget: OutputBudget, output_tokens: int, truncated: bool = False):
+        """Fold an observed output size into the correction factor"""
+        if not output_tokens:
+            return
+        raw = self.raw_estimate(budget.agent_type, budget.duration, budget.interest_count,
+                                budget.activities_per_day, budget.short_descriptions)
+        ratio = output_tokens / raw
+        if truncated:
+            ratio *= 1.5
+        ratio = min(3.0, max(0.3, ratio))
+
+        with self._lock:
+            current = self.correction.get(budget.agent_type)
+            if current is None:
+                self.correction[budget.agent_type] = ratio
+            else:
+                self.correction[budget.agent_type] = (1 - self.smoothing) * current + self.smoothing * ratio
+            self.observations[budget.agent_type] = self.observations.get(budget.agent_type, 0) + 1
+            if self.state_file:
+                try:
+                    self._save()
+                except OSError as e:
+                    # Losing a learned factor must never fail a request
+                    print(f"⚠️ Could not save output budget state {self.state_file}: {e}")
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Learned correction factors, served by GET /output-budget"""
+        with self._lock:
+            return {
+                agent_type: {"correction": round(factor, 3), "observations": self.observations.get(agent_type, 0)}
+                for agent_type, factor in self.correction.items()
+            }
+
+    def _load(self):
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        for agent_type, entry in state.get("corrections", {}).items():
+            self.correction[agent_type] = float(entry["correction"])
+            self.observations[agent_type] = int(entry.get("observations", 0))
+
+    def _save(self):
+        # Called with the lock held; write then rename so a crash never leaves half a file
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "corrections": {
+                    agent_type: {"correction": factor, "observations": self.observations.get(agent_type, 0)}
+                    for agent_type, factor in self.correction.items()
+                }
+            }, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+
+# Shared by every agent so all requests of a type learn together
+output_budgeter = OutputBudgeter()
@@ -0,0 +1,118 @@
+# backend/agents/response_cache.py
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from datetime import datetime
+import gzip
+import json
+import os
+import threading
+import time
+
+from .memory_shards import MEMORY_DIR
+from .memory_stats import destination_key
+
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_HOURS", "168")) * 3600
+CACHE_SNAPSHOT = os.getenv("RESPONSE_CACHE_SNAPSHOT", os.path.join(MEMORY_DIR, "cache_snapshot.json.gz"))
+SNAPSHOT_VERSION = 1
+
+
+def make_cache_key(kind: str, **params: Any) -> str:
+    """Stable key for an agent response.
+
+    Destinations are compared case-insensitively and interest order does
+    not matter, so equivalent requests share one entry.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name == "destination":
+            value = destination_key(value)
+        elif name == "interests":
+            value = sorted(value or [])
+        elif name == "budget":
+            # 1000 from the CLI and 1000.0 from the API are the same budget
+            value = float(value or 0)
+        normalized[name] = value
+    return f"{kind}:{json.dumps(normalized, sort_keys=True)}"
+
+
+class ResponseCache:
+    """Bounded LRU of parsed agent responses with a TTL"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return now - entry["stored_at"] > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, time.time()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["value"]
+
+    def set(self, key: str, value: Dict[str, Any], stored_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = {"value": value, "stored_at": stored_at or time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def export_snapshot(self, path: str = CACHE_SNAPSHOT) -> int:
+        """Write live entries to a gzipped JSON snapshot, returns the entry count"""
+        now = time.time()
+        with self._lock:
+            entries = [
+                {"key": key, "stored_at": entry["stored_at"], "value": entry["value"]}
+                for key, entry in self._entries.items()
+                if not self._expired(entry, now)
+            ]
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename so a reader never sees a half-written snapshot
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({
+                "version": SNAPSHOT_VERSION,
+                "created_at": str(datetime.now()),
+                "entries": entries
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        return len(entries)
+
+    def import_snapshot(self, path: str = CACHE_SNAPSHOT) -> int:
+        """Load entries from a snapshot, skipping expired ones, returns the entry count"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported cache snapshot version: {snapshot.get('version')}")
+
+        now = time.time()
+        loaded = 0
+        # Oldest first so the LRU order matches the exporting instance
+        for entry in sorted(snapshot.get("entries", []), key=lambda e: e["stored_at"]):
+            if self._expired(entry, now):
+                continue
+            self.set(entry["key"], entry["value"], stored_at=entry["stored_at"])
+            loaded += 1
+        return loaded
+
+
+# Shared by every agent in the process
+response_cache = ResponseCache()
@@ -0,0 +1,190 @@
+# backend/agents/tracing.py
+"""Lightweight request tracing with OpenTelemetry-compatible JSON export.
+
+A trace is started per API request; nested spans are opened around agents,
+LLM calls, parsing and memory I/O. Sampling is decided once per trace, and
+spans outside a sampled trace cost a single context lookup. Finished traces
+are written as one OTLP/JSON `resourceSpans` document per line to a
+rotating local file.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Any, List, Optional
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))
+# backend/traces, wherever the server is started from
+TRACE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "traces")
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(TRACE_DIR, "spans.jsonl"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", "5"))
+SERVICE_NAME = "travel-planning-assistant"
+
+# OTLP enum values
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    def __init__(self, name: str, trace: "Trace", parent: Optional["Span"], kind: int,
+                 attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else ""
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = {"code": STATUS_OK}
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException):
+        self.status = {"code": STATUS_ERROR, "message": f"{type(error).__name__}: {error}"}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": self.status
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """Spans of one request, exported together when the root span ends"""
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List[Span] = []
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, trace_file: str = TRACE_FILE):
+        self.sample_rate = sample_rate
+        self.trace_file = trace_file
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self._current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+        self._logger: Optional[logging.Logger] = None
+        self._lock = threading.Lock()
+
+    def current_trace_id(self) -> Optional[str]:
+        trace = self._current_trace.get()
+        return trace.trace_id if trace else None
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    @contextmanager
+    def start_trace(self, name: str, force: bool = False, kind: int = SPAN_KIND_SERVER, **attributes):
+        """Start a new trace with a root span; yields the trace id"""
+        sampled = force or random.random() < self.sample_rate
+        trace = Trace(f"{random.getrandbits(128):032x}", sampled)
+        trace_token = self._current_trace.set(trace)
+        # The root span never inherits a span from an enclosing trace
+        span_token = self._current.set(None)
+        try:
+            if not sampled:
+                yield trace.trace_id
+                return
+            try:
+                with self._span(name, trace, kind, attributes):
+                    yield trace.trace_id
+            finally:
+                self._export(trace)
+        finally:
+            self._current.reset(span_token)
+            self._current_trace.reset(trace_token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Open a child span; a no-op yielding None outside a sampled trace"""
+        trace = self._current_trace.get()
+        if trace is None or not trace.sampled:
+            yield None
+            return
+        with self._span(name, trace, SPAN_KIND_INTERNAL, attributes) as span:
+            yield span
+
+    @contextmanager
+    def _span(self, name: str, trace: Trace, kind: int, attributes: Dict[str, Any]):
+        span = Span(name, trace, self._current.get(), kind, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self._current.reset(token)
+            trace.spans.append(span)
+
+    def _get_logger(self) -> logging.Logger:
+        # Created on first export so unsampled deployments never touch the disk
+        with self._lock:
+            if self._logger is None:
+                directory = os.path.dirname(self.trace_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                handler = RotatingFileHandler(
+                    self.trace_file, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUP_COUNT, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger(f"{__name__}.export")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+    def _export(self, trace: Trace):
+        document = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in trace.spans]
+                }]
+            }]
+        }
+        try:
+            self._get_logger().info(json.dumps(document, ensure_ascii=False, separators=(",", ":")))
+        except OSError as e:
+            # Tracing must never break a request
+            print(f"⚠️ Could not export trace {trace.trace_id}: {e}")
+
+
+# Shared by the API and every agent
+tracer = Tracer()
@@ -0,0 +1,167 @@
+# backend/agents/trip_planner.py
+import google.generativeai as genai
+import json
+from typing import Dict, Any, List
+from .base import BaseAgent, GEMINI_API_KEY, extract_json
+from .tracing import tracer
+from .output_budget import OutputBudget
+from .memory_shards import DEFAULT_USER
+from datetime import datetime
+
+
+class TripPlannerAgent(BaseAgent):
+    """Combined planning mode: itinerary, costs and culture in one generation.
+
+    Shares the destination/duration/interests context across the three
+    sections instead of repeating it in three prompts, then splits the
+    result into the same shape the separate agents return.
+    """
+
+    def __init__(self):
+        super().__init__("Trip Planner")
+        # Configuration automatique avec la clé API
+        genai.configure(api_key=GEMINI_API_KEY)
+        self.model = genai.GenerativeModel('gemini-2.0-flash')
+
+    def process_request(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        self.last_usage = None
+        destination = user_input.get("destination", "")
+        budget = user_input.get("budget", 0)
+        interests = user_input.get("interests", [])
+        duration = user_input.get("duration", 3)
+        user_id = user_input.get("user_id") or DEFAULT_USER
+
+        # Load previous preferences from memory
+        memory = self.load_memory(user_id)
+        preferences = memory.get("preferences", {})
+
+        output_budget = self.output_budgeter.plan("combined", duration, len(interests))
+        with tracer.span("prompt.build", agent=self.name):
+            prompt = self._build_prompt(destination, budget, interests, duration, preferences, output_budget)
+
+        response = self.call_gemini(prompt, output_budget)
+
+        # Try to parse JSON from response
+        try:
+            plan_data = extract_json(response)
+            if plan_data is None:
+                plan_data = {}
+                error = "Could not parse trip plan"
+            else:
+                error = None
+        except json.JSONDecodeError:
+            plan_data = {}
+            error = "Invalid JSON response"
+
+        itinerary_data = plan_data.get("itinerary") or {"days": [], "error": error or "Missing itinerary section"}
+        cost_data = plan_data.get("cost_breakdown") or {"error": error or "Missing cost section"}
+        culture_data = plan_data.get("cultural_guide") or {"error": error or "Missing cultural section"}
+
+        # Save to memory
+        trip_data = {
+            "destination": destination,
+            "budget": budget,
+            "interests": interests,
+            "duration": duration,
+            "itinerary": itinerary_data,
+            "created_at": str(datetime.now())
+        }
+        # A failed generation is not a planned trip, keep it out of history and stats
+        if "error" not in itinerary_data:
+            self.add_to_memory("trips", trip_data, user_id)
+
+        # Same shape as the three separate agents so clients need no changes; the
+        # single raw response covers all three and is only included once
+        return {
+            "itinerary": {
+                "agent": "Itinerary Builder",
+                "itinerary": itinerary_data,
+                "raw_response": response
+            },
+            "cost_estimate": {
+                "agent": "Cost Estimator",
+                "cost_breakdown": cost_data
+            },
+            "cultural_guide": {
+                "agent": "Local Culture Coach",
+                "cultural_guide": culture_data
+            }
+        }
+
+    def _build_prompt(self, destination: str, budget: float, interests: List[str], duration: int,
+                      preferences: Dict[str, Any], output_budget: OutputBudget) -> str:
+        preferences_section = f"Previous travel preferences: {json.dumps(preferences)}" if preferences else ""
+
+        return f"""
+        Plan a {duration}-day trip to {destination}.
+        Budget: ${budget}
+        Interests: {', '.join(interests)}
+        {preferences_section}
+
+        Provide three sections in a single JSON object:
+        1. "itinerary": daily schedule with time slots, locations, durations, cost estimates,
+           must-see attractions based on interests and free/budget-friendly alternatives
+        2. "cost_breakdown": accommodation, transportation, food, activities, shopping and a 10%
+           emergency fund for 3 budget levels (budget, mid_range, luxury), a daily spending guide,
+           money saving tips and alerts if the plan exceeds the budget
+        3. "cultural_guide": etiquette, essential phrases, food culture, dress code, local events,
+           hidden gems and cultural warnings
+
+        Keep it concise: at most {output_budget.activities_per_day} activities per day, {output_budget.description_hint}
+        and at most {output_budget.list_items} items in every other list.
+
+        Format as JSON:
+        {{
+            "itinerary": {{
+                "days": [
+                    {{
+                        "day": 1,
+                        "activities": [
+                            {{"time": "09:00", "activity": "Activity name", "location": "Location",
+                              "duration": "2 hours", "cost_estimate": "$20", "description": "Brief description"}}
+                        ]
+                    }}
+                ]
+            }},
+            "cost_breakdown": {{
+                "budget_levels": {{
+                    "budget": {{
+                        "accommodation": {{"per_night": 50, "total": 150}},
+                        "transportation": {{"flights": 300, "local": 60}},
+                        "food": {{"per_day": 30, "total": 90}},
+                        "activities": 100,
+                        "shopping": 50,
+                        "emergency": 75,
+                        "total": 825
+                    }},
+                    "mid_range": {{}},
+                    "luxury": {{}}
+                }},
+                "daily_spending_guide": [
+                    {{"day": 1, "estimated_spending": 120, "breakdown": {{"meals": 40, "activities": 60, "transport": 20}}}}
+                ],
+                "money_saving_tips": ["Tip 1", "Tip 2"],
+                "budget_alerts": ["Warning if over budget"]
+            }},
+            "cultural_guide": {{
+                "cultural_etiquette": [
+                    {{"category": "Greetings", "tip": "Bow slightly when meeting someone", "importance": "high"}}
+                ],
+                "language_basics": {{
+                    "essential_phrases": [
+                        {{"english": "Thank you", "local": "Merci", "pronunciation": "mer-SEE"}}
+                    ],
+                    "useful_apps": ["Duolingo", "Google Translate"]
+                }},
+                "food_culture": {{
+                    "must_try": ["Dish 1", "Dish 2"],
+                    "dietary_considerations": ["Vegetarian options"],
+                    "dining_etiquette": ["Wait to be seated"]
+                }},
+                "dress_code": {{"general": "Casual dress is acceptable", "religious_sites": "Cover shoulders and knees"}},
+                "local_events": [{{"name": "Festival Name", "dates": "Month", "description": "Brief description"}}],
+                "hidden_gems": [{{"name": "Secret spot", "type": "viewpoint", "tip": "Best at sunset"}}],
+                "cultural_warnings": ["Avoid pointing with index finger"]
+            }}
+        }}
+        """
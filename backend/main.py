@@ -1,14 +1,20 @@
 # backend/main.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Literal
 import json
 import os
 from agents.base import BaseAgent
 from agents.itinerary_builder import ItineraryBuilderAgent
 from agents.cost_estimator import CostEstimatorAgent
 from agents.local_culture_coach import LocalCultureCoachAgent
+from agents.trip_planner import TripPlannerAgent
+from agents.memory_stats import summarize_stats
+from agents.memory_shards import DEFAULT_USER
+from agents.response_cache import response_cache, CACHE_SNAPSHOT
+from agents.tracing import tracer
+from agents.output_budget import output_budgeter
 
 app = FastAPI(title="Travel Planning Assistant", version="1.0.0")
 
@@ -21,10 +27,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Trace each request (sampled); send `X-Trace: 1` to force a trace"""
+    force = request.headers.get("x-trace") == "1"
+    with tracer.start_trace(f"{request.method} {request.url.path}", force=force,
+                            **{"http.method": request.method, "http.target": request.url.path}) as trace_id:
+        response = await call_next(request)
+        root = tracer.current_span()
+        if root is not None:
+            root.set_attribute("http.status_code", response.status_code)
+    # Unsampled traces are never exported, so only hand out ids that can be looked up
+    if root is not None:
+        response.headers["X-Trace-Id"] = trace_id
+    return response
+
+
 # Initialize agents
 itinerary_agent = ItineraryBuilderAgent()
 cost_agent = CostEstimatorAgent()
 culture_agent = LocalCultureCoachAgent()
+trip_planner = TripPlannerAgent()
+
+# Start warm from the last exported cache snapshot, if any
+if os.path.exists(CACHE_SNAPSHOT):
+    try:
+        print(f"🔥 Loaded {response_cache.import_snapshot(CACHE_SNAPSHOT)} cached responses from {CACHE_SNAPSHOT}")
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not load cache snapshot {CACHE_SNAPSHOT}: {e}")
+
+
+def run_agent(agent: BaseAgent, user_input: Dict[str, Any]) -> Dict[str, Any]:
+    """Run an agent inside its own trace span"""
+    with tracer.span("agent.process_request", agent=agent.name):
+        return agent.process_request(user_input)
 
 
 class TravelRequest(BaseModel):
@@ -33,6 +70,9 @@ class TravelRequest(BaseModel):
     interests: List[str]
     duration: int = 3
     agent: Optional[str] = "all"
+    user_id: Optional[str] = DEFAULT_USER
+    # "separate": one prompt per agent, "combined": a single generation for all three
+    mode: Literal["separate", "combined"] = "separate"
 
 
 class MemoryResponse(BaseModel):
@@ -41,37 +81,46 @@ class MemoryResponse(BaseModel):
     visited_places: List[str]
 
 
+# Handlers that call agents or touch memory are plain `def` so FastAPI runs
+# them in its threadpool: LLM calls and one user's memory I/O then no longer
+# block requests for other users.
 @app.post("/plan-trip")
-async def plan_trip(request: TravelRequest):
+def plan_trip(request: TravelRequest):
     """Main endpoint to plan a trip using all agents"""
     try:
         user_input = request.dict()
 
+        if request.mode == "combined" and request.agent not in ("all", None):
+            raise HTTPException(status_code=422, detail="Combined mode only applies to agent 'all'")
+
         if request.agent == "all" or request.agent is None:
-            # Get responses from all agents
-            itinerary_response = itinerary_agent.process_request(user_input)
-            cost_response = cost_agent.process_request(user_input)
-            culture_response = culture_agent.process_request(user_input)
+            if request.mode == "combined":
+                # One generation covering all three sections
+                results = run_agent(trip_planner, user_input)
+            else:
+                # Get responses from all agents
+                results = {
+                    "itinerary": run_agent(itinerary_agent, user_input),
+                    "cost_estimate": run_agent(cost_agent, user_input),
+                    "cultural_guide": run_agent(culture_agent, user_input)
+                }
 
             return {
                 "success": True,
                 "destination": request.destination,
                 "budget": request.budget,
                 "duration": request.duration,
-                "results": {
-                    "itinerary": itinerary_response,
-                    "cost_estimate": cost_response,
-                    "cultural_guide": culture_response
-                }
+                "mode": request.mode,
+                "results": results
             }
         else:
             # Get response from specific agent
             if request.agent == "itinerary":
-                response = itinerary_agent.process_request(user_input)
+                response = run_agent(itinerary_agent, user_input)
             elif request.agent == "cost":
-                response = cost_agent.process_request(user_input)
+                response = run_agent(cost_agent, user_input)
             elif request.agent == "culture":
-                response = culture_agent.process_request(user_input)
+                response = run_agent(culture_agent, user_input)
             else:
                 raise HTTPException(status_code=400, detail="Invalid agent specified")
 
@@ -80,31 +129,78 @@ async def plan_trip(request: TravelRequest):
                 "results": response
             }
 
+    except HTTPException:
+        # Keep 4xx errors raised above instead of reporting them as 500s
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/memory")
-async def get_memory():
-    """Get travel memory/history"""
+def get_memory(user_id: str = DEFAULT_USER):
+    """Get a user's travel memory/history"""
     try:
-        memory = itinerary_agent.load_memory()
+        memory = itinerary_agent.load_memory(user_id)
         return MemoryResponse(**memory)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/memory/clear")
-async def clear_memory():
-    """Clear travel memory"""
+def clear_memory(user_id: str = DEFAULT_USER):
+    """Clear a user's travel memory"""
     try:
-        empty_memory = {"trips": [], "preferences": {}, "visited_places": []}
-        itinerary_agent.save_memory(empty_memory)
+        itinerary_agent.clear_memory(user_id)
         return {"success": True, "message": "Memory cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/memory/stats")
+def get_memory_stats(user_id: str = DEFAULT_USER, top_n: int = 10):
+    """Get a user's travel history analytics from precomputed aggregates"""
+    try:
+        return summarize_stats(itinerary_agent.load_stats(user_id), top_n)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/memory/stats/rebuild")
+def rebuild_memory_stats(user_id: str = DEFAULT_USER):
+    """Recompute a user's travel history analytics from their full history"""
+    try:
+        stats = itinerary_agent.rebuild_stats(user_id)
+        return {"success": True, "trip_count": stats["trip_count"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/cache/export")
+def export_cache():
+    """Export cached agent responses to the snapshot file"""
+    try:
+        count = response_cache.export_snapshot(CACHE_SNAPSHOT)
+        return {"success": True, "entries": count, "path": CACHE_SNAPSHOT}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/cache/import")
+def import_cache():
+    """Import cached agent responses from the snapshot file"""
+    try:
+        count = response_cache.import_snapshot(CACHE_SNAPSHOT)
+        return {"success": True, "entries": count, "path": CACHE_SNAPSHOT}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/output-budget")
+async def get_output_budget():
+    """Learned output-size correction factors per agent type"""
+    return output_budgeter.snapshot()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -118,9 +214,14 @@ async def root():
         "message": "Travel Planning Assistant API",
         "version": "1.0.0",
         "endpoints": {
-            "POST /plan-trip": "Plan a trip with AI agents",
+            "POST /plan-trip": "Plan a trip with AI agents (mode: separate | combined)",
             "GET /memory": "Get travel history",
             "POST /memory/clear": "Clear travel memory",
+            "GET /memory/stats": "Get travel history analytics",
+            "POST /memory/stats/rebuild": "Recompute travel history analytics",
+            "POST /cache/export": "Export cached responses to a snapshot",
+            "POST /cache/import": "Import cached responses from a snapshot",
+            "GET /output-budget": "Learned output size corrections per agent",
             "GET /health": "Health check"
         },
         "agents": [
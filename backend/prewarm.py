@@ -0,0 +1,139 @@
+# backend/prewarm.py
+"""Pre-warm the response cache for popular destinations.
+
+Run off-peak from the backend directory (like main.py). Targets come from
+the most planned destinations in trip history and/or a supplied list; each
+gets a cultural guide and its unit costs, generated with bounded
+concurrency under a requests-per-minute limit. The warmed cache is merged
+into the snapshot file that the API loads on startup:
+
+    python prewarm.py --top 20
+    python prewarm.py --destinations "Paris, France" "Tokyo, Japan" --concurrency 2 --rpm 10
+"""
+import argparse
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from agents.base import BaseAgent
+from agents.cost_estimator import CostEstimatorAgent
+from agents.local_culture_coach import LocalCultureCoachAgent
+from agents.memory_shards import DEFAULT_USER
+from agents.memory_stats import destination_key
+from agents.response_cache import response_cache, make_cache_key, CACHE_SNAPSHOT
+
+# Same default as the Streamlit sidebar, the most common request shape
+DEFAULT_INTERESTS = ["Culture", "Food"]
+
+
+class RateLimiter:
+    """Spaces calls evenly so at most `rpm` start per minute across threads"""
+
+    def __init__(self, rpm: float):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+def history_targets(agent: BaseAgent, user_ids: List[str], top_n: int) -> List[Dict[str, Any]]:
+    """Most planned destinations with their most common interests.
+
+    Culture cache keys include the interests, so each destination is warmed
+    with the combination travelers actually send most; unit costs only
+    depend on the destination.
+    """
+    destinations = Counter()
+    names = {}
+    interests = {}
+    for user_id in user_ids:
+        for trip in agent.load_memory(user_id).get("trips", []):
+            name = (trip.get("destination") or "").strip()
+            if not name:
+                continue
+            key = destination_key(name)
+            destinations[key] += 1
+            names.setdefault(key, name)
+            interests.setdefault(key, Counter())[tuple(sorted(trip.get("interests", [])))] += 1
+
+    return [
+        {"destination": names[key], "interests": list(interests[key].most_common(1)[0][0])}
+        for key, _ in destinations.most_common(top_n)
+    ]
+
+
+def warm(agent: BaseAgent, kind: str, target: Dict[str, Any], limiter: RateLimiter) -> str:
+    if kind == "culture":
+        key = make_cache_key("culture", destination=target["destination"], interests=target["interests"])
+    else:
+        key = make_cache_key("cost_units", destination=target["destination"])
+    if key in response_cache:
+        return "cached"
+
+    limiter.wait()
+    if kind == "culture":
+        agent.process_request(target)
+    else:
+        agent.unit_costs(target["destination"])
+    return "warmed" if key in response_cache else "failed"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the response cache for popular destinations")
+    parser.add_argument("--top", type=int, default=10, help="Warm the N most planned destinations from history")
+    parser.add_argument("--user-id", nargs="+", default=[DEFAULT_USER], help="Histories to rank destinations from")
+    parser.add_argument("--destinations", nargs="+", default=[], help="Extra destinations to warm")
+    parser.add_argument("--interests", nargs="+", default=DEFAULT_INTERESTS, help="Interests for --destinations")
+    parser.add_argument("--concurrency", type=int, default=2, help="Maximum LLM calls in flight")
+    parser.add_argument("--rpm", type=float, default=10, help="Maximum LLM calls started per minute")
+    parser.add_argument("--snapshot", default=CACHE_SNAPSHOT, help="Snapshot file to merge into and write")
+    args = parser.parse_args()
+
+    if os.path.exists(args.snapshot):
+        print(f"📦 Loaded {response_cache.import_snapshot(args.snapshot)} entries from {args.snapshot}")
+
+    culture_agent = LocalCultureCoachAgent()
+    cost_agent = CostEstimatorAgent()
+
+    targets = history_targets(culture_agent, args.user_id, args.top) if args.top > 0 else []
+    for destination in args.destinations:
+        targets.append({"destination": destination, "interests": args.interests})
+    if not targets:
+        print("Nothing to warm: no trip history and no --destinations given")
+        return
+
+    limiter = RateLimiter(args.rpm)
+    outcomes = Counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        futures = {
+            executor.submit(warm, agent, kind, target, limiter): (kind, target["destination"])
+            for target in targets
+            for kind, agent in (("culture", culture_agent), ("cost", cost_agent))
+        }
+        for future in as_completed(futures):
+            kind, destination = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = "failed"
+                print(f"❌ {kind:<8} {destination}: {e}")
+            else:
+                print(f"{'✅' if outcome != 'failed' else '❌'} {kind:<8} {destination}: {outcome}")
+            outcomes[outcome] += 1
+
+    count = response_cache.export_snapshot(args.snapshot)
+    print(f"🔥 {outcomes['warmed']} warmed, {outcomes['cached']} already cached, {outcomes['failed']} failed")
+    print(f"💾 Wrote {count} entries to {args.snapshot}")
+
+
+if __name__ == "__main__":
+    main()
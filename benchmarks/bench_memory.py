@@ -0,0 +1,266 @@
+# benchmarks/bench_memory.py
+"""Micro-benchmarks for the memory store and LLM response parsing.
+
+Generates synthetic trip histories and noisy LLM responses, times the hot
+operations and writes machine-readable JSON results that can be compared
+across commits:
+
+    python benchmarks/bench_memory.py --output bench_before.json
+    python benchmarks/bench_memory.py --output bench_after.json --compare bench_before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from agents.base import BaseAgent, extract_json  # noqa: E402
+from agents.memory_stats import summarize_stats  # noqa: E402
+from agents.memory_shards import ShardCache  # noqa: E402
+
+DESTINATIONS = [
+    "Paris, France", "Tokyo, Japan", "Rome, Italy", "Barcelona, Spain", "New York, USA",
+    "Marrakech, Morocco", "Bangkok, Thailand", "Lisbon, Portugal", "Tunis, Tunisia", "Kyoto, Japan",
+    "Istanbul, Turkey", "Cape Town, South Africa", "Buenos Aires, Argentina", "Sydney, Australia",
+]
+INTERESTS = [
+    "Culture", "History", "Food", "Nature", "Adventure", "Shopping",
+    "Architecture", "Museums", "Nightlife", "Beach", "Art", "Photography",
+]
+DEFAULT_SIZES = [100, 10_000, 100_000]
+RESPONSE_DAYS = [1, 3, 7, 14, 30]
+
+
+class BenchAgent(BaseAgent):
+    """Concrete agent used only to exercise the BaseAgent memory methods."""
+
+    def __init__(self, memory_dir: str):
+        super().__init__("Benchmark")
+        self.memory_shards = ShardCache(memory_dir)
+
+    def process_request(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+
+def make_itinerary(rng: random.Random, days: int) -> Dict[str, Any]:
+    return {
+        "days": [
+            {
+                "day": day,
+                "activities": [
+                    {
+                        "time": f"{9 + 3 * slot:02d}:00",
+                        "activity": f"Activity {day}.{slot}",
+                        "location": rng.choice(DESTINATIONS),
+                        "duration": f"{rng.randint(1, 4)} hours",
+                        "cost_estimate": f"${rng.randint(0, 120)}",
+                        "description": "Synthetic activity used for benchmarking the memory store."
+                    }
+                    for slot in range(3)
+                ]
+            }
+            for day in range(1, days + 1)
+        ]
+    }
+
+
+def make_trip(rng: random.Random, created_at: datetime) -> Dict[str, Any]:
+    duration = rng.randint(1, 10)
+    return {
+        "destination": rng.choice(DESTINATIONS),
+        "budget": rng.randrange(200, 10_000, 50),
+        "interests": rng.sample(INTERESTS, rng.randint(1, 4)),
+        "duration": duration,
+        "itinerary": make_itinerary(rng, duration),
+        "created_at": str(created_at)
+    }
+
+
+def make_history(rng: random.Random, size: int) -> Dict[str, Any]:
+    start = datetime(2023, 1, 1)
+    trips = [make_trip(rng, start + timedelta(hours=i)) for i in range(size)]
+    return {"trips": trips, "preferences": {}, "visited_places": []}
+
+
+def make_response(rng: random.Random, days: int, noise: str) -> str:
+    """Build an LLM-like response around a JSON payload.
+
+    noise is one of "clean", "fenced" (markdown code fence) or "chatty"
+    (prose before and after the JSON, including stray braces).
+    """
+    payload = json.dumps(make_itinerary(rng, days), indent=2)
+    if noise == "fenced":
+        return f"```json\n{payload}\n```"
+    if noise == "chatty":
+        intro = "Sure! Here is your plan. " * rng.randint(5, 50)
+        outro = "Let me know if you want changes {or more ideas}. " * rng.randint(5, 50)
+        return f"{intro}\n{payload}\n{outro}"
+    return payload
+
+
+def time_op(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "max_s": max(samples)
+    }
+
+
+def repeat_for(size: int, budget: int) -> int:
+    """Fewer repetitions for larger histories so the suite stays bounded."""
+    return max(1, min(20, budget // max(size, 1)))
+
+
+def bench_memory(size: int, seed: int, budget: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    history = make_history(rng, size)
+    new_trip = make_trip(rng, datetime.now())
+    repeat = repeat_for(size, budget)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = BenchAgent(os.path.join(tmp, "memory"))
+        agent.save_memory(history)
+        file_bytes = os.path.getsize(agent.memory_shards.get().memory_file)
+
+        def cold_load():
+            agent.memory_shards.clear()
+            return agent.load_memory()
+
+        results = {
+            "load_memory_cold": time_op(cold_load, repeat),
+            "load_memory": time_op(agent.load_memory, repeat),
+            "add_to_memory": time_op(lambda: agent.add_to_memory("trips", new_trip), repeat),
+        }
+
+        def query():
+            trips = agent.load_memory().get("trips", [])
+            return [t for t in trips if t.get("destination") == "Paris, France"]
+
+        results["query_by_destination"] = time_op(query, repeat)
+        results["rebuild_stats"] = time_op(agent.rebuild_stats, repeat)
+        results["memory_stats"] = time_op(lambda: summarize_stats(agent.load_stats()), repeat)
+
+        memory = agent.load_memory()
+        results["serialize_memory"] = time_op(lambda: json.dumps(memory), repeat)
+
+    return {"trips": size, "file_bytes": file_bytes, "operations": results}
+
+
+def parses(response: str) -> bool:
+    """Run the agents' extraction path, reporting failures instead of raising."""
+    try:
+        return extract_json(response) is not None
+    except json.JSONDecodeError:
+        return False
+
+
+def bench_parse(seed: int, repeat: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    results = []
+    for days in RESPONSE_DAYS:
+        for noise in ("clean", "fenced", "chatty"):
+            response = make_response(rng, days, noise)
+            results.append({
+                "days": days,
+                "noise": noise,
+                "response_bytes": len(response.encode("utf-8")),
+                "parsed": parses(response),
+                "extract_json": time_op(lambda: parses(response), repeat)
+            })
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: Dict[str, Any]) -> Dict[str, float]:
+    """Map every benchmark to its median time, keyed by a stable name."""
+    flat = {}
+    for entry in results.get("memory", []):
+        for op, stats in entry["operations"].items():
+            flat[f"memory[{entry['trips']}].{op}"] = stats["median_s"]
+    for entry in results.get("parse", []):
+        flat[f"parse[{entry['days']}d,{entry['noise']}]"] = entry["extract_json"]["median_s"]
+    return flat
+
+
+def parse_failures(results: Dict[str, Any]) -> int:
+    return sum(1 for entry in results.get("parse", []) if not entry["parsed"])
+
+
+def print_comparison(current: Dict[str, Any], baseline: Dict[str, Any]):
+    now, before = flatten(current), flatten(baseline)
+    print(f"\n{'benchmark':<45}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, value in now.items():
+        if name not in before:
+            continue
+        change = (value - before[name]) / before[name] * 100 if before[name] else 0.0
+        print(f"{name:<45}{before[name] * 1000:>10.3f}ms{value * 1000:>10.3f}ms{change:>+9.1f}%")
+    print(f"{'parse failures':<45}{parse_failures(baseline):>12}{parse_failures(current):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory store and response parsing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Synthetic history sizes (number of trips)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget", type=int, default=100_000,
+                        help="Trips processed per operation; controls repetitions per size")
+    parser.add_argument("--parse-repeat", type=int, default=200)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "memory": [],
+        "parse": []
+    }
+
+    for size in args.sizes:
+        print(f"⏱️  memory store with {size} trips...")
+        results["memory"].append(bench_memory(size, args.seed, args.budget))
+    print("⏱️  response parsing...")
+    results["parse"] = bench_parse(args.seed, args.parse_repeat)
+    results["parse_failures"] = parse_failures(results)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"✅ Results written to {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
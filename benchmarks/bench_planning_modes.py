@@ -0,0 +1,165 @@
+# benchmarks/bench_planning_modes.py
+"""Compare the separate (three prompts) and combined (one prompt) planning modes.
+
+Sends the same trip requests through both paths against the live Gemini API
+and reports total tokens, latency and parse-failure rate per mode as JSON:
+
+    python benchmarks/bench_planning_modes.py --runs 5 --output modes.json
+
+Needs a valid GEMINI_API_KEY in backend/agents/base.py. Trips are written to
+a temporary memory store, never to backend/memory, the response cache is
+bypassed so repeated requests are not answered from cache, and learned
+output budget corrections are neither read nor saved.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from agents.itinerary_builder import ItineraryBuilderAgent  # noqa: E402
+from agents.cost_estimator import CostEstimatorAgent  # noqa: E402
+from agents.local_culture_coach import LocalCultureCoachAgent  # noqa: E402
+from agents.trip_planner import TripPlannerAgent  # noqa: E402
+from agents.memory_shards import ShardCache  # noqa: E402
+from agents.response_cache import ResponseCache  # noqa: E402
+from agents.output_budget import OutputBudgeter  # noqa: E402
+
+SAMPLE_REQUESTS = [
+    {"destination": "Paris, France", "budget": 1500, "interests": ["Culture", "Food"], "duration": 3},
+    {"destination": "Tokyo, Japan", "budget": 3000, "interests": ["Food", "Shopping", "Nightlife"], "duration": 7},
+    {"destination": "Marrakech, Morocco", "budget": 800, "interests": ["History", "Architecture"], "duration": 4},
+    {"destination": "Lisbon, Portugal", "budget": 2000, "interests": ["Art", "Beach", "Photography", "Food"], "duration": 10},
+]
+SECTIONS = {
+    "itinerary": "itinerary",
+    "cost_estimate": "cost_breakdown",
+    "cultural_guide": "cultural_guide",
+}
+
+
+def add_usage(total: Dict[str, int], usage: Optional[Dict[str, int]]):
+    for key, value in (usage or {}).items():
+        total[key] = total.get(key, 0) + (value or 0)
+
+
+def failed_sections(results: Dict[str, Any]) -> List[str]:
+    """Names of sections that came back with a parse error"""
+    return [
+        section for section, field in SECTIONS.items()
+        if "error" in results.get(section, {}).get(field, {"error": "missing"})
+    ]
+
+
+def run_separate(agents: Dict[str, Any], user_input: Dict[str, Any]) -> Dict[str, Any]:
+    usage: Dict[str, int] = {}
+    results = {}
+    for section, agent in agents.items():
+        results[section] = agent.process_request(user_input)
+        add_usage(usage, agent.last_usage)
+    return {"results": results, "usage": usage, "calls": len(agents)}
+
+
+def run_combined(planner: TripPlannerAgent, user_input: Dict[str, Any]) -> Dict[str, Any]:
+    results = planner.process_request(user_input)
+    usage: Dict[str, int] = {}
+    add_usage(usage, planner.last_usage)
+    return {"results": results, "usage": usage, "calls": 1}
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = [s["latency_s"] for s in samples]
+    sections = sum(len(SECTIONS) for _ in samples)
+    failures = sum(len(s["failed_sections"]) for s in samples)
+
+    def mean_tokens(key: str) -> float:
+        return statistics.fmean(s["usage"].get(key, 0) for s in samples)
+
+    return {
+        "requests": len(samples),
+        "latency_median_s": statistics.median(latencies),
+        "latency_mean_s": statistics.fmean(latencies),
+        "latency_max_s": max(latencies),
+        "prompt_tokens_mean": mean_tokens("prompt_tokens"),
+        "output_tokens_mean": mean_tokens("output_tokens"),
+        "total_tokens_mean": mean_tokens("total_tokens"),
+        "section_failure_rate": failures / sections if sections else 0.0,
+        "request_failure_rate": sum(1 for s in samples if s["failed_sections"]) / len(samples)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare separate vs combined planning modes")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions of each sample request")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shards = ShardCache(tmp)
+        # A negative TTL expires every entry on read, so each request reaches Gemini in both modes
+        no_cache = ResponseCache(max_entries=1, ttl_seconds=-1)
+        # Both modes learn from the same fresh corrections, never the server's saved ones
+        budgeter = OutputBudgeter(state_file=None)
+        agents = {
+            "itinerary": ItineraryBuilderAgent(),
+            "cost_estimate": CostEstimatorAgent(),
+            "cultural_guide": LocalCultureCoachAgent(),
+        }
+        planner = TripPlannerAgent()
+        for agent in [*agents.values(), planner]:
+            agent.memory_shards = shards
+            agent.response_cache = no_cache
+            agent.output_budgeter = budgeter
+
+        samples = {"separate": [], "combined": []}
+        for run in range(args.runs):
+            for request in SAMPLE_REQUESTS:
+                user_input = {**request, "user_id": "benchmark"}
+                # Alternate the order so neither mode always goes first
+                modes = ["separate", "combined"] if run % 2 == 0 else ["combined", "separate"]
+                for mode in modes:
+                    print(f"⏱️  run {run + 1}/{args.runs} {mode:<8} {request['destination']}")
+                    start = time.perf_counter()
+                    if mode == "separate":
+                        outcome = run_separate(agents, user_input)
+                    else:
+                        outcome = run_combined(planner, user_input)
+                    samples[mode].append({
+                        "destination": request["destination"],
+                        "duration": request["duration"],
+                        "latency_s": time.perf_counter() - start,
+                        "calls": outcome["calls"],
+                        "usage": outcome["usage"],
+                        "failed_sections": failed_sections(outcome["results"])
+                    })
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "summary": {mode: summarize(mode_samples) for mode, mode_samples in samples.items()},
+        "samples": samples
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"✅ Results written to {args.output}")
+    else:
+        print(output)
+
+    print(f"\n{'mode':<10}{'latency p50':>14}{'tokens':>10}{'failures':>10}")
+    for mode, summary in results["summary"].items():
+        print(f"{mode:<10}{summary['latency_median_s']:>13.2f}s{summary['total_tokens_mean']:>10.0f}"
+              f"{summary['section_failure_rate']:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
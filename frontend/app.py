@@ -50,14 +50,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def call_api(endpoint, data=None, method="GET"):
+def call_api(endpoint, data=None, method="GET", params=None):
     """Helper function to call API"""
     url = f"{API_BASE_URL}{endpoint}"
     try:
         if method == "POST":
-            response = requests.post(url, json=data)
+            response = requests.post(url, json=data, params=params)
         else:
-            response = requests.get(url)
+            response = requests.get(url, params=params)
 
         response.raise_for_status()
         return response.json()
@@ -75,6 +75,10 @@ def main():
     with st.sidebar:
         st.header("🎯 Trip Details")
 
+        user_id = st.text_input("👤 Traveler ID", value="default",
+                                help="Trips and history are kept separately for each traveler")
+        st.session_state.user_id = user_id or "default"
+
         destination = st.text_input("📍 Destination", placeholder="e.g., Paris, France")
 
         col1, col2 = st.columns(2)
@@ -98,6 +102,15 @@ def main():
             ["All Agents", "Itinerary Builder", "Cost Estimator", "Local Culture Coach"]
         )
 
+        planning_mode = "separate"
+        if agent_choice == "All Agents":
+            planning_mode = st.radio(
+                "Planning mode:",
+                ["separate", "combined"],
+                format_func=lambda mode: "Three agent calls" if mode == "separate" else "Single combined call",
+                horizontal=True
+            )
+
         agent_map = {
             "All Agents": "all",
             "Itinerary Builder": "itinerary",
@@ -114,7 +127,7 @@ def main():
         if st.button("📚 View History"):
             st.session_state.show_history = True
         if st.button("🗑️ Clear Memory"):
-            response = call_api("/memory/clear", method="POST")
+            response = call_api("/memory/clear", method="POST", params={"user_id": st.session_state.user_id})
             if response and response.get("success"):
                 st.success("Memory cleared!")
 
@@ -127,7 +140,9 @@ def main():
                 "budget": budget,
                 "interests": interests,
                 "duration": duration,
-                "agent": agent_map[agent_choice]
+                "agent": agent_map[agent_choice],
+                "user_id": st.session_state.user_id,
+                "mode": planning_mode
             }
 
             # Call API
@@ -319,7 +334,9 @@ def display_travel_history():
     """Display travel history from memory"""
     st.header("📚 Travel History")
 
-    memory_data = call_api("/memory")
+    display_history_stats()
+
+    memory_data = call_api("/memory", params={"user_id": st.session_state.get("user_id", "default")})
     if memory_data:
         trips = memory_data.get("trips", [])
 
@@ -340,5 +357,54 @@ def display_travel_history():
             st.info("No trip history found. Start planning your first trip!")
 
 
+def display_history_stats():
+    """Display travel analytics from precomputed aggregates"""
+    stats = call_api("/memory/stats", params={"user_id": st.session_state.get("user_id", "default")})
+    if not stats or not stats.get("trip_count"):
+        return
+
+    st.subheader("📊 Travel Insights")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Trips Planned", stats.get("trip_count", 0))
+    with col2:
+        st.metric("Average Budget", f"${stats.get('average_budget', 0)}")
+    with col3:
+        st.metric("Average Duration", f"{stats.get('average_duration', 0)} days")
+
+    top_destinations = stats.get("top_destinations", [])
+    if top_destinations:
+        dest_df = pd.DataFrame(top_destinations)
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = px.bar(dest_df, x="destination", y="trips", title="Top Destinations")
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            fig = px.bar(
+                dest_df, x="destination", y="average_budget",
+                title="Average Budget per Destination",
+                labels={"average_budget": "Average Budget ($)"}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    interests = stats.get("interest_frequency", {})
+    if interests:
+        with col1:
+            fig = px.pie(names=list(interests.keys()), values=list(interests.values()), title="Interests")
+            st.plotly_chart(fig, use_container_width=True)
+
+    months = stats.get("trips_per_month", {})
+    if months:
+        with col2:
+            fig = px.line(
+                x=list(months.keys()), y=list(months.values()), markers=True,
+                title="Trips per Month", labels={"x": "Month", "y": "Trips"}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    st.divider()
+
+
 if __name__ == "__main__":
     main()